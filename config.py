@@ -100,10 +100,21 @@ DEFAULT_HEADERS = {
 # Request timeout in seconds
 REQUEST_TIMEOUT = 30
 
+# Maximum page size read by the fetcher; larger bodies are truncated
+MAX_RESPONSE_BYTES = 10 * 1024 * 1024  # 10 MB
+
 # Retry configuration for external API calls
 MAX_RETRIES = 2
 RETRY_DELAY = 1  # seconds
 
+# Firecrawl throttling: concurrent scrapes per process and backoff on 429s
+FIRECRAWL_CONCURRENCY = int(os.getenv('FIRECRAWL_CONCURRENCY', '2'))
+FIRECRAWL_MAX_RETRIES = int(os.getenv('FIRECRAWL_MAX_RETRIES', '3'))
+FIRECRAWL_RETRY_BASE_DELAY = float(os.getenv('FIRECRAWL_RETRY_BASE_DELAY', '2.0'))  # seconds
+# Worker threads for FirecrawlFetcher.fetch_many (API calls are still capped
+# by FIRECRAWL_CONCURRENCY; extra workers serve cache hits and parsing)
+FIRECRAWL_MAX_WORKERS = int(os.getenv('FIRECRAWL_MAX_WORKERS', '8'))
+
 # ============================================================================
 # UI Configuration
 # ============================================================================
@@ -134,6 +145,10 @@ STATUS_LABELS = {
 ENABLE_CACHING = True
 CACHE_TTL = 3600  # 1 hour in seconds
 
+# Firecrawl scrapes are cached on disk so re-analyzing a URL doesn't spend quota
+FIRECRAWL_CACHE_DIR = os.getenv('FIRECRAWL_CACHE_DIR', '.cache/firecrawl')
+FIRECRAWL_CACHE_TTL = int(os.getenv('FIRECRAWL_CACHE_TTL', CACHE_TTL))  # seconds
+
 # Rate limiting to prevent excessive API usage
 RATE_LIMIT_ENABLED = True
 MAX_REQUESTS_PER_HOUR = 50
@@ -0,0 +1,143 @@
+"""Regression checks for WebsiteFetcher, run with: python -m unittest"""
+
+import unittest
+from unittest import mock
+
+from utils.fetcher import WebsiteFetcher
+from utils.snapshot import PageSnapshot
+
+
+class _FakeResponse:
+    """Minimal stand-in for a streamed requests.Response"""
+
+    def __init__(self, body, content_type='text/html', chunk_sizes=None):
+        self.body = body
+        self.status_code = 200
+        self.headers = {'Content-Type': content_type}
+        self.encoding = content_type.split('charset=')[-1] if 'charset=' in content_type else None
+        self.chunk_sizes = chunk_sizes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        # chunk_sizes mimics chunked transfer encoding handing back short reads
+        sizes = iter(self.chunk_sizes or ())
+        pos = 0
+        while pos < len(self.body):
+            size = next(sizes, chunk_size)
+            yield self.body[pos:pos + size]
+            pos += size
+
+
+def _fetch(body, **response_kwargs):
+    fetcher = WebsiteFetcher('https://example.com/page')
+    with mock.patch('utils.fetcher.requests.get', return_value=_FakeResponse(body, **response_kwargs)):
+        fetcher.fetch()
+    return fetcher
+
+
+class CharsetTests(unittest.TestCase):
+    PAGE = (
+        '<html><head><meta charset="{charset}"><title>{title}</title>'
+        '<meta name="description" content="{title}"></head>'
+        '<body><p>{title}</p></body></html>'
+    )
+
+    def check(self, charset, codec, title):
+        body = self.PAGE.format(charset=charset, title=title).encode(codec)
+        fetcher = _fetch(body)
+        self.assertEqual(fetcher.get_title(), title)
+        self.assertEqual(fetcher.get_meta_description(), title)
+        self.assertIn(title, fetcher.get_text_content())
+
+    def test_euc_kr(self):
+        self.check('euc-kr', 'euc_kr', '한국어 제목')
+
+    def test_euc_jp(self):
+        self.check('euc-jp', 'euc_jp', '日本語のタイトル')
+
+    def test_mac_roman(self):
+        self.check('macintosh', 'mac_roman', 'Café Crème')
+
+    def test_meta_charset_after_a_short_first_read(self):
+        body = self.PAGE.format(charset='windows-1252', title='Café Crème').encode('cp1252')
+        fetcher = _fetch(body, chunk_sizes=[16, 16])
+        self.assertEqual(fetcher.encoding, 'cp1252')
+        self.assertEqual(fetcher.get_title(), 'Café Crème')
+        self.assertNotIn('\ufffd', fetcher.html_content)
+
+
+class StrayHeadMarkupTests(unittest.TestCase):
+    """libxml2 opens <body> early at stray head content; later metas still count"""
+
+    # The padding script pushes the stray markup past the first (encoding
+    # sniffing) read, so the chunked run really feeds it in small pieces
+    PAGE = (
+        '<html><head><title>Title</title><script>/*' + 'x' * 70000 + '*/</script>{stray}'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        '<meta name="description" content="Description"></head>'
+        '<body><p>Body text</p></body></html>'
+    )
+    STRAYS = [
+        '<img src="/pixel.gif">',
+        '<div id="plugin"></div>',
+        '<span>x</span>',
+        '<a href="/">home</a>',
+        'plain text',
+    ]
+
+    def test_metas_after_stray_elements(self):
+        for stray in self.STRAYS:
+            body = self.PAGE.format(stray=stray).encode('utf-8')
+            # Also split the markup into tiny chunks so </head> straddles reads
+            for chunk_sizes in (None, [5] * len(body)):
+                with self.subTest(stray=stray, chunked=bool(chunk_sizes)):
+                    fetcher = _fetch(body, chunk_sizes=chunk_sizes)
+                    self.assertTrue(fetcher.check_viewport())
+                    self.assertEqual(fetcher.get_meta_description(), 'Description')
+                    self.assertEqual(fetcher.get_title(), 'Title')
+
+
+class LinkTests(unittest.TestCase):
+    def test_repeated_targets_are_counted_once(self):
+        body = (
+            b'<html><body><nav><a href="/about">About</a><a href="https://other.com/">Other</a></nav>'
+            b'<p><a href="https://example.com/about">About</a><a href="https://other.com/">Other</a></p></body></html>'
+        )
+        self.assertEqual(_fetch(body).get_links(), {
+            'internal': ['https://example.com/about'],
+            'external': ['https://other.com/'],
+            'invalid': [],
+        })
+
+
+class SnapshotTests(unittest.TestCase):
+    def test_snapshot_collects_every_accessor_once(self):
+        fetcher = _fetch(b'<html><head><title>Title</title></head><body><h1>Heading</h1></body></html>')
+        # Keep robots.txt off the network
+        fetcher._robots_fetched = True
+        snapshot = fetcher.snapshot()
+        self.assertIsInstance(snapshot, PageSnapshot)
+        self.assertEqual(snapshot.title, 'Title')
+        self.assertEqual(snapshot.headings['h1'], ['Heading'])
+        self.assertIs(fetcher.snapshot(), snapshot)
+
+
+class EmptyBodyTests(unittest.TestCase):
+    def test_empty_200_response_still_has_a_soup(self):
+        fetcher = _fetch(b'')
+        self.assertEqual(fetcher.soup.find_all('p'), [])
+        self.assertEqual(fetcher.get_title(), '')
+        self.assertEqual(fetcher.get_word_count(), 0)
+        self.assertEqual(fetcher.get_links(), {'internal': [], 'external': [], 'invalid': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+"""Regression checks for FirecrawlFetcher, run with: python -m unittest"""
+
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import config
+from utils import fetcher_firecrawl
+from utils.fetcher_firecrawl import FirecrawlFetcher, _markdown_to_text
+from utils.snapshot import PageSnapshot
+
+
+class _FakeApp:
+    """Firecrawl client stand-in that replays canned documents and counts calls"""
+
+    def __init__(self, *documents):
+        self.documents = list(documents)
+        self.calls = 0
+
+    def scrape(self, url, formats):
+        document = self.documents[min(self.calls, len(self.documents) - 1)]
+        self.calls += 1
+        return document
+
+
+def _document(markdown='', html='', links=None):
+    return SimpleNamespace(markdown=markdown, html=html, links=links or [])
+
+
+class FirecrawlTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(config, ENABLE_CACHING=False, FIRECRAWL_RETRY_BASE_DELAY=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Keep robots.txt off the network, with a fresh per-origin memo each test
+        self.robots_request = mock.patch.object(fetcher_firecrawl, '_request_robots_txt', return_value=None).start()
+        mock.patch.dict(fetcher_firecrawl._ROBOTS_FUTURES, clear=True).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def make_fetcher(self, *documents, url='https://example.com/page', need_html=None):
+        fetcher = FirecrawlFetcher(url, api_key='fc-test', need_html=need_html)
+        fetcher.app = _FakeApp(*documents)
+        return fetcher
+
+
+class MarkdownToTextTests(unittest.TestCase):
+    CASES = [
+        # Headings
+        ('# Title\n## Sub title\n###### Six', 'Title Sub title Six'),
+        ('####### seven\n#nospace', '####### seven #nospace'),
+        ('#\nfoo', 'foo'),
+        # Code fences and inline code
+        ('before\n```python\nx = 1\n```\nafter', 'before after'),
+        ('para\n```\nunclosed fence', 'para ``` unclosed fence'),
+        ('Use `code` and ``more`` here', 'Use and here'),
+        ('Use ```x``` here', 'Use here'),
+        # Links and images
+        ('[link](http://x) and [a](b)[c](d)', 'link and ac'),
+        ('![img](http://y) text ![](z)', 'text'),
+        ('![a [b] c](x.png) text', 'text'),
+        ('[wiki](http://x/a_(b)) end', 'wiki end'),
+        # Emphasis
+        ('*em* **strong** ***both*** _u_ __uu__', 'em strong both u uu'),
+        ('**bold with [link](u)** and *it*', 'bold with link and it'),
+    ]
+
+    def test_known_outputs(self):
+        for markdown, expected in self.CASES:
+            with self.subTest(markdown=markdown):
+                self.assertEqual(_markdown_to_text(markdown), expected)
+
+
+class MarkdownToTextSpeedTests(unittest.TestCase):
+    """~100 KB of unbalanced syntax; quadratic patterns took seconds here ('!['*40000 took 6.9 s)"""
+
+    INPUTS = {
+        'image openers': '![a](' * 20000,
+        'bare image openers': '![' * 50000,
+        'brackets': '[' * 100000,
+        'nested alt brackets': '![[a]' * 20000,
+        'star emphasis': '*a' * 50000,
+        'underscore emphasis': '_a' * 50000,
+        'backticks': '`' * 100000,
+        'code spans': '`a' * 50000,
+    }
+
+    def test_unbalanced_input_stays_fast(self):
+        for name, markdown in self.INPUTS.items():
+            with self.subTest(name):
+                start = time.perf_counter()
+                _markdown_to_text(markdown)
+                self.assertLess(time.perf_counter() - start, 1.0)
+
+
+class RetryTests(FirecrawlTestCase):
+    def test_short_page_is_not_retried(self):
+        fetcher = self.make_fetcher(_document(markdown='# Hi', html='<html><body><h1>Hi</h1></body></html>'))
+        fetcher.fetch()
+        self.assertEqual(fetcher.app.calls, 1)
+        self.assertEqual(fetcher.get_headings()['h1'], ['Hi'])
+
+    def test_empty_result_is_retried(self):
+        fetcher = self.make_fetcher(_document(), _document(markdown='# Hi'))
+        fetcher.fetch()
+        self.assertEqual(fetcher.app.calls, 2)
+        self.assertEqual(fetcher.markdown_content, '# Hi')
+
+
+class RobotsTxtTests(FirecrawlTestCase):
+    def test_one_request_per_origin(self):
+        page = _document(markdown='# Hi')
+        urls = ['https://example.com/a', 'https://example.com/b', 'https://example.com/c', 'https://other.com/']
+        with mock.patch.object(FirecrawlFetcher, 'app', _FakeApp(page)):
+            results = FirecrawlFetcher.fetch_many(urls, api_key='fc-test')
+        for fetcher in results.values():
+            fetcher.fetch_robots_txt()
+        self.assertEqual(
+            sorted(call.args[0] for call in self.robots_request.call_args_list),
+            ['https://example.com', 'https://other.com'],
+        )
+
+    def test_cache_hit_does_not_request_robots_txt(self):
+        fetcher = self.make_fetcher(_document(markdown='# Hi'))
+        with mock.patch.object(fetcher, '_load_cached', return_value={'markdown': '# Hi', 'html': '', 'links': []}):
+            fetcher.fetch()
+        self.robots_request.assert_not_called()
+
+
+class MarkdownImageTests(FirecrawlTestCase):
+    MARKDOWN = (
+        '![a](<a b.png>)\n\n'
+        '```\n![fenced](fenced.png)\n```\n\n'
+        '`![inline](inline.png)` ![ref][logo] ![*em* text](em.png)\n\n'
+        '[logo]: /logo.png\n'
+    )
+
+    def test_markdown_only_images_match_the_rendered_html(self):
+        markdown_only = self.make_fetcher(_document(markdown=self.MARKDOWN), need_html=False)
+        markdown_only.fetch()
+        rendered = self.make_fetcher(_document(markdown=self.MARKDOWN, html=markdown_only._markdown_to_html(self.MARKDOWN)))
+        rendered.fetch()
+
+        self.assertEqual(
+            [(image['src'], image['alt']) for image in markdown_only.get_images()],
+            [('a%20b.png', 'a'), ('/logo.png', 'ref'), ('em.png', 'em text')],
+        )
+        self.assertEqual(markdown_only.get_images(), rendered.get_images())
+
+
+class LazySoupTests(FirecrawlTestCase):
+    def test_fetch_and_extractors_do_not_build_the_soup(self):
+        fetcher = self.make_fetcher(_document(markdown='# Hi', html='<html><body><h1>Hi</h1></body></html>'))
+        with mock.patch.object(fetcher_firecrawl, '_parse_soup') as parse_soup:
+            fetcher.fetch()
+            fetcher.get_headings()
+            fetcher.get_links()
+            parse_soup.assert_not_called()
+            fetcher.soup
+            parse_soup.assert_called_once()
+
+
+class SnapshotTests(FirecrawlTestCase):
+    def test_snapshot_matches_the_accessors(self):
+        fetcher = self.make_fetcher(_document(markdown='# Hi', html='<html><head><title>Title</title></head><body><h1>Hi</h1></body></html>'))
+        fetcher.fetch()
+        snapshot = fetcher.snapshot()
+        self.assertIsInstance(snapshot, PageSnapshot)
+        self.assertEqual(snapshot.title, fetcher.get_title())
+        self.assertEqual(snapshot.word_count, fetcher.get_word_count())
+        self.assertIs(fetcher.snapshot(), snapshot)
+
+
+class DiskCacheTests(FirecrawlTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.multiple(
+            config, ENABLE_CACHING=True, FIRECRAWL_CACHE_DIR=self.cache_dir.name, FIRECRAWL_MAX_RETRIES=0,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cache_files(self):
+        return sorted(os.listdir(self.cache_dir.name))
+
+    def test_empty_result_is_not_cached(self):
+        self.make_fetcher(_document()).fetch()
+        self.assertEqual(self.cache_files(), [])
+
+    def test_failed_write_leaves_no_temp_file(self):
+        fetcher = self.make_fetcher()
+        fetcher._store_cached({'markdown': object(), 'html': '', 'links': []})
+        self.assertEqual(self.cache_files(), [])
+
+    def age(self, name, seconds):
+        path = os.path.join(self.cache_dir.name, name)
+        with open(path, 'w') as f:
+            f.write('{}')
+        old = time.time() - seconds
+        os.utime(path, (old, old))
+
+    def test_expired_entries_are_pruned(self):
+        stale_ttl = config.FIRECRAWL_CACHE_TTL + 60
+        self.age('0' * 64 + '.json', stale_ttl)
+        self.age('firecrawl-abc123.tmp', stale_ttl)
+        # Not ours: the cache dir may be shared, so these must survive
+        self.age('important.txt', 2 * 86400)
+        self.age('notes.md', 2 * 86400)
+
+        with mock.patch.object(fetcher_firecrawl, '_last_cache_prune', 0.0):
+            fetcher = self.make_fetcher(_document(markdown='# Hi'))
+            fetcher.fetch()
+        self.assertEqual(
+            self.cache_files(),
+            sorted([os.path.basename(fetcher._cache_path()), 'important.txt', 'notes.md']),
+        )
+
+    def test_non_dict_entry_is_a_cache_miss(self):
+        fetcher = self.make_fetcher(_document(markdown='# Hi'))
+        with open(fetcher._cache_path(), 'w') as f:
+            f.write('[]')
+        fetcher.fetch()
+        self.assertEqual(fetcher.app.calls, 1)
+        self.assertEqual(fetcher.markdown_content, '# Hi')
+
+if __name__ == '__main__':
+    unittest.main()
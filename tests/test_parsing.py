@@ -0,0 +1,62 @@
+"""Regression checks for utils.parsing, run with: python -m unittest"""
+
+import unittest
+from urllib.parse import urljoin, urlparse
+
+from utils.parsing import classify_links
+
+
+def _classify_with_urljoin(hrefs, base_url):
+    """The plain urljoin/urlparse classification the fast path must reproduce"""
+    links = {'internal': [], 'external': [], 'invalid': []}
+    base_domain = urlparse(base_url).netloc
+    for href in hrefs:
+        href = href.strip()
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+        try:
+            absolute_url = urljoin(base_url, href)
+            link_domain = urlparse(absolute_url).netloc
+        except ValueError:
+            links['invalid'].append(href)
+            continue
+        if link_domain == base_domain or not link_domain:
+            links['internal'].append(absolute_url)
+        else:
+            links['external'].append(absolute_url)
+    return {kind: list(dict.fromkeys(urls)) for kind, urls in links.items()}
+
+
+class ClassifyLinksTests(unittest.TestCase):
+    BASES = ['https://example.com/dir/page', 'http://example.com', 'https://example.com:8080/', 'https://example.com/p?x#y']
+    HREFS = [
+        # Root-relative
+        '/a', '/', '/a?b#c', '/a b', '/%20x',
+        # Absolute
+        'https://example.com', 'https://example.com/a', 'http://other.com?q', 'https://Example.com/x',
+        'https://example.com:8080/p', 'http://u:p@example.com/x', 'HTTP://example.com/x',
+        # Dot segments and plain relative
+        '/a/../b', '/./a', './x', '../x', 'x/y', '?q=1', 'https://example.com/a/./b',
+        # Scheme-relative
+        '//example.com/a', '//other.com',
+        # Empty query or fragment, which urljoin drops
+        '/a?', '/a#', '/a?#', '/a?#f', '/a?q#', 'https://other.com?', 'https://other.com/x#',
+        # Tab/CR/LF, which urljoin removes
+        '/a\tb', '/a\nb', '/a\rb', 'https://other.com/a\tb',
+        # Malformed IPv6
+        'http://[::1]/x', 'http://[bad/x', 'https://[bad',
+    ]
+
+    def test_fast_path_matches_urljoin(self):
+        for base in self.BASES:
+            for href in self.HREFS:
+                with self.subTest(base=base, href=href):
+                    self.assertEqual(classify_links([href], base), _classify_with_urljoin([href], base))
+
+    def test_empty_query_and_fragment_dedupe_with_the_bare_url(self):
+        links = classify_links(['/a', '/a#', '/a?'], 'https://example.com/')
+        self.assertEqual(links['internal'], ['https://example.com/a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
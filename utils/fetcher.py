@@ -1,18 +1,132 @@
 """Utilities for fetching and parsing website content"""
 
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from bs4.dammit import EncodingDetector
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+import codecs
 import time
 import re
 import config
+from utils.parsing import JSONDecodeError, WHITESPACE_RE, classify_links, json_loads
+from utils.snapshot import PageSnapshot
+
+# Class/id patterns for locating the main content container. Every pattern
+# contains "content", so one combined search finds the same element as
+# trying each pattern in turn.
+_CONTENT_PATTERN = re.compile('|'.join(['content', 'main-content', 'post-content', 'article-content', 'page-content']), re.I)
+
+# Classes of non-content elements stripped from the content area. Short
+# tokens are word-bounded so "ad" no longer matches "header" or "shadow".
+_NON_CONTENT_PATTERN = re.compile('|'.join(['sidebar', 'menu', 'navigation', r'\bnav\b', 'breadcrumb', 'advertisement', r'\bad\b', 'social', 'share', 'related', 'comment']), re.I)
+
+# Tags that can hold the main content; get_text_content only needs these,
+# so its working copy skips <head> and anything outside <body>
+_MAIN_STRAINER = SoupStrainer(['main', 'article', 'div', 'section', 'body'])
+
+_HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Bytes read from the socket (and fed to the <head> parser) per step
+_CHUNK_SIZE = 64 * 1024
+
+# An explicit end of <head> in the raw markup. libxml2 also opens <body> on
+# its own at the first stray element or text inside <head> (tracking pixels,
+# plugin markup), so its body event alone doesn't mean the head is over.
+_HEAD_END_RE = re.compile(rb'</head\s*>|<body[\s>]', re.I)
+
+
+class _HeadParser:
+    """Incrementally collects <title> and <meta> tags, stopping once <head> is over"""
+    
+    def __init__(self, encoding):
+        self.title = None
+        self.meta = {}
+        self.meta_tags = {}
+        self.done = False
+        self._body_started = False
+        self._head_closed = False
+        self._tail = b''
+        self._decoder = None
+        try:
+            self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        except LookupError:
+            # libxml2 doesn't know every Python codec name (euc_kr, mac-roman,
+            # ...), so decode those here and feed lxml text instead
+            self._parser = etree.HTMLPullParser(events=('start', 'end'))
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    
+    def feed(self, data):
+        if self.done:
+            return
+        if not self._head_closed:
+            # Carry a few bytes over so a marker split across chunks is found
+            self._head_closed = bool(_HEAD_END_RE.search(self._tail + data))
+            self._tail = data[-7:]
+        try:
+            if self._decoder:
+                data = self._decoder.decode(data)
+            self._parser.feed(data)
+            self._read_events()
+            # Finish the whole chunk first: metas after a stray element and
+            # before </head> arrive after libxml2's implicit <body>
+            self.done = self._body_started and self._head_closed
+        except etree.LxmlError:
+            # Keep whatever was collected before the parser gave up
+            self.done = True
+    
+    def close(self):
+        if self.done:
+            return
+        try:
+            if self._decoder:
+                self._parser.feed(self._decoder.decode(b'', final=True))
+            self._parser.close()
+            self._read_events()
+        except etree.LxmlError:
+            pass
+        self.done = True
+    
+    def _read_events(self):
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if element.tag == 'body':
+                    self._body_started = True
+                continue
+            
+            if element.tag == 'title' and self.title is None:
+                self.title = element.text or ''
+            elif element.tag == 'meta':
+                content = element.get('content')
+                # First <meta name=...> wins, matching soup.find()
+                if element.get('name'):
+                    self.meta.setdefault(element.get('name').lower(), content or '')
+                name = element.get('name') or element.get('property') or element.get('http-equiv')
+                if name and content:
+                    self.meta_tags[name] = content
+
 
 class WebsiteFetcher:
     def __init__(self, url):
         self.url = url
+        self._parsed_base = urlparse(url)
         self.html_content = None
-        self.soup = None
+        self.html_bytes = None
+        self.encoding = None
         self.status_code = None
+        self._soup = None
+        self._soup_index = None
+        self._text_cache = None
+        self._headings_cache = None
+        self._images_cache = None
+        self._links_cache = None
+        self._snapshot = None
+        self._title_text = None
+        self._meta_by_name = None
+        self._meta_tags = None
+        self._robots_txt = None
+        self._robots_fetched = False
         
     def fetch(self):
         """Fetch HTML content from URL with retry logic for Snowflake"""
@@ -23,17 +137,33 @@ class WebsiteFetcher:
             try:
                 # Use improved headers from config for better bot detection bypass
                 headers = getattr(config, 'DEFAULT_HEADERS', {'User-Agent': config.USER_AGENT})
-                response = requests.get(
+                with requests.get(
                     self.url, 
                     headers=headers, 
                     timeout=config.REQUEST_TIMEOUT,
                     allow_redirects=True,
-                    verify=True  # SSL verification
-                )
-                response.raise_for_status()  # Raise exception for bad status codes
-                self.status_code = response.status_code
-                self.html_content = response.text
-                self.soup = BeautifulSoup(self.html_content, 'lxml')
+                    verify=True,  # SSL verification
+                    stream=True
+                ) as response:
+                    response.raise_for_status()  # Raise exception for bad status codes
+                    self.status_code = response.status_code
+                    # The <head> is parsed while the rest of the body downloads
+                    self.html_bytes, head = self._read_body(response)
+                
+                # Decode the body once with the declared charset rather than
+                # letting response.text run charset detection over it
+                self.html_content = self.html_bytes.decode(self.encoding, errors='replace')
+                # The full soup is only built when something traverses the body
+                self._soup = None
+                self._soup_index = None
+                self._text_cache = None
+                self._headings_cache = None
+                self._images_cache = None
+                self._links_cache = None
+                self._snapshot = None
+                self._title_text = head.title
+                self._meta_by_name = head.meta
+                self._meta_tags = head.meta_tags
                 return True
             except requests.exceptions.Timeout:
                 if attempt < max_retries:
@@ -60,40 +190,154 @@ class WebsiteFetcher:
             except Exception as e:
                 raise Exception(f"Unexpected error: {str(e)}")
     
+    def _read_body(self, response):
+        """Read the body in chunks up to config.MAX_RESPONSE_BYTES, parsing <head> as it arrives"""
+        max_bytes = getattr(config, 'MAX_RESPONSE_BYTES', 10 * 1024 * 1024)
+        chunks = []
+        size = 0
+        head = None
+        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if head is None:
+                # Chunked transfer encoding can hand back short reads, so wait
+                # for a full chunk's worth before looking for <meta charset>
+                if size < _CHUNK_SIZE and size < max_bytes:
+                    continue
+                head = self._start_head_parser(response, b''.join(chunks))
+            else:
+                head.feed(chunk)
+            if size >= max_bytes:
+                break
+        
+        if head is None:
+            head = self._start_head_parser(response, b''.join(chunks))
+        head.close()
+        return b''.join(chunks)[:max_bytes], head
+    
+    def _start_head_parser(self, response, prefix):
+        """Resolve the encoding from the first bytes and feed them to a new _HeadParser"""
+        self.encoding = self._resolve_encoding(response, prefix)
+        head = _HeadParser(self.encoding)
+        head.feed(prefix)
+        return head
+    
+    def _resolve_encoding(self, response, first_chunk):
+        """Pick the body encoding: HTTP charset, then <meta> charset, then UTF-8"""
+        content_type = response.headers.get('Content-Type', '').lower()
+        candidates = [
+            response.encoding if 'charset=' in content_type else None,
+            EncodingDetector.find_declared_encoding(first_chunk, is_html=True),
+        ]
+        for encoding in candidates:
+            if encoding:
+                try:
+                    return codecs.lookup(encoding).name
+                except LookupError:
+                    continue
+        return 'utf-8'
+    
+    @property
+    def soup(self):
+        """Full-document BeautifulSoup tree, parsed on first access"""
+        # An empty 200 response still gets an (empty) soup so the analyzers
+        # can query it; only an unfetched page has no soup
+        if self._soup is None and self.html_bytes is not None:
+            self._soup = BeautifulSoup(self.html_bytes, 'lxml', from_encoding=self.encoding)
+        return self._soup
+    
+    def _index_soup(self):
+        """Bucket the elements the accessors read, in one pass over the soup"""
+        if self._soup_index is None and self.soup is not None:
+            index = {'headings': [], 'img': [], 'a': [], 'json_ld': [], 'itemtype': []}
+            for element in self.soup.descendants:
+                if not isinstance(element, Tag):
+                    continue
+                name = element.name
+                attrs = element.attrs
+                if name in _HEADING_TAGS:
+                    index['headings'].append(element)
+                elif name == 'img':
+                    index['img'].append(element)
+                elif name == 'a':
+                    if 'href' in attrs:
+                        index['a'].append(element)
+                elif name == 'script' and attrs.get('type') == 'application/ld+json':
+                    index['json_ld'].append(element)
+                if 'itemtype' in attrs:
+                    index['itemtype'].append(element)
+            self._soup_index = index
+        return self._soup_index
+    
+    def _parse_head_only(self, html_bytes):
+        """Parse <head> from already-downloaded bytes, stopping once it is over"""
+        head = _HeadParser(self.encoding)
+        for start in range(0, len(html_bytes), _CHUNK_SIZE):
+            head.feed(html_bytes[start:start + _CHUNK_SIZE])
+            if head.done:
+                break
+        head.close()
+        return head
+    
+    def _ensure_metadata(self):
+        """Populate title and meta lookups from one <head> parse, once per fetch"""
+        if self._meta_by_name is not None:
+            return True
+        if not self.html_bytes:
+            return False
+        head = self._parse_head_only(self.html_bytes)
+        self._title_text = head.title
+        self._meta_by_name = head.meta
+        self._meta_tags = head.meta_tags
+        return True
+    
     def get_title(self):
         """Extract page title"""
-        if self.soup:
-            title_tag = self.soup.find('title')
-            return title_tag.get_text().strip() if title_tag else ""
+        if self._ensure_metadata() and self._title_text:
+            return self._title_text.strip()
         return ""
     
     def get_meta_description(self):
         """Extract meta description"""
-        if self.soup:
-            meta_desc = self.soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                return meta_desc['content'].strip()
+        if self._ensure_metadata():
+            content = self._meta_by_name.get('description')
+            if content:
+                return content.strip()
         return ""
     
     def get_headings(self):
+        """Extract all headings (H1-H6), computed once per fetch"""
+        if self._headings_cache is None:
+            self._headings_cache = self._extract_headings()
+        return self._headings_cache
+    
+    def _extract_headings(self):
         """Extract all headings (H1-H6)"""
         headings = {'h1': [], 'h2': [], 'h3': [], 'h4': [], 'h5': [], 'h6': []}
-        if self.soup:
-            for level in range(1, 7):
-                tag = f'h{level}'
-                for heading in self.soup.find_all(tag):
-                    text = heading.get_text().strip()
-                    if text:
-                        headings[tag].append(text)
+        index = self._index_soup()
+        if index:
+            for heading in index['headings']:
+                text = heading.get_text().strip()
+                if text:
+                    headings[heading.name].append(text)
         return headings
     
     def get_text_content(self):
+        """Extract main text content, computed once per fetch"""
+        if self._text_cache is None:
+            self._text_cache = self._extract_text_content()
+        return self._text_cache
+    
+    def _extract_text_content(self):
         """Extract main text content with improved prioritization - FIXED"""
-        if not self.soup:
+        if not self.html_bytes:
             return ""
         
-        # Create a copy to avoid modifying original
-        soup_copy = BeautifulSoup(str(self.soup), 'lxml')
+        # Parse a separate, strained copy from the raw bytes so the
+        # decompose() calls below don't modify self.soup
+        soup_copy = BeautifulSoup(self.html_bytes, 'lxml', parse_only=_MAIN_STRAINER, from_encoding=self.encoding)
+        if not soup_copy.contents:
+            soup_copy = BeautifulSoup(self.html_bytes, 'lxml', from_encoding=self.encoding)
         
         # CRITICAL FIX #1: Prioritize main content areas
         # Try to find the main content container in order of priority
@@ -112,18 +356,11 @@ class WebsiteFetcher:
         
         # 4. Look for common content class/id patterns
         if not main_content:
-            content_patterns = ['content', 'main-content', 'post-content', 'article-content', 'page-content']
-            for pattern in content_patterns:
-                main_content = soup_copy.find(['div', 'section'], class_=re.compile(pattern, re.I))
-                if main_content:
-                    break
+            main_content = soup_copy.find(['div', 'section'], class_=_CONTENT_PATTERN)
         
         # 5. Look for common content ID patterns
         if not main_content:
-            for pattern in content_patterns:
-                main_content = soup_copy.find(['div', 'section'], id=re.compile(pattern, re.I))
-                if main_content:
-                    break
+            main_content = soup_copy.find(['div', 'section'], id=_CONTENT_PATTERN)
         
         # If we found a main content area, use it. Otherwise, use the whole body
         content_area = main_content if main_content else soup_copy.find('body')
@@ -135,18 +372,14 @@ class WebsiteFetcher:
         for element in content_area(["script", "style", "nav", "footer", "header", "aside", "form", "iframe"]):
             element.decompose()
         
-        # Also remove elements with common non-content classes
-        non_content_patterns = ['sidebar', 'menu', 'navigation', 'nav', 'breadcrumb', 'advertisement', 'ad', 'social', 'share', 'related', 'comment']
-        for pattern in non_content_patterns:
-            for element in content_area.find_all(class_=re.compile(pattern, re.I)):
-                element.decompose()
+        # Also remove elements with common non-content classes (single pass)
+        for element in content_area.find_all(class_=_NON_CONTENT_PATTERN):
+            element.decompose()
         
         text = content_area.get_text()
         
         # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        text = WHITESPACE_RE.sub(' ', text).strip()
         
         # FALLBACK: If we got almost nothing, try getting ALL body text
         # This helps with JavaScript-heavy sites
@@ -160,17 +393,22 @@ class WebsiteFetcher:
                     element.decompose()
                 
                 text = body.get_text()
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
+                text = WHITESPACE_RE.sub(' ', text).strip()
         
         return text
     
     def get_images(self):
+        """Extract all images, computed once per fetch"""
+        if self._images_cache is None:
+            self._images_cache = self._extract_images()
+        return self._images_cache
+    
+    def _extract_images(self):
         """Extract all images with FIXED alt text detection"""
         images = []
-        if self.soup:
-            for img in self.soup.find_all('img'):
+        index = self._index_soup()
+        if index:
+            for img in index['img']:
                 alt_text = img.get('alt', '').strip()
                 has_alt_attr = 'alt' in img.attrs
                 
@@ -190,52 +428,43 @@ class WebsiteFetcher:
         return images
     
     def get_links(self):
+        """Extract all links (internal and external), computed once per fetch"""
+        if self._links_cache is None:
+            self._links_cache = self._extract_links()
+        return self._links_cache
+    
+    def _extract_links(self):
         """Extract all links (internal and external) - IMPROVED"""
-        links = {'internal': [], 'external': [], 'invalid': []}
-        if self.soup:
-            base_domain = urlparse(self.url).netloc
-            for link in self.soup.find_all('a', href=True):
-                href = link['href'].strip()
-                
-                # Skip empty hrefs, anchors, and javascript
-                if not href or href.startswith('#') or href.startswith('javascript:') or href.startswith('mailto:') or href.startswith('tel:'):
-                    continue
-                
-                try:
-                    absolute_url = urljoin(self.url, href)
-                    link_domain = urlparse(absolute_url).netloc
-                    
-                    if link_domain == base_domain or not link_domain:
-                        links['internal'].append(absolute_url)
-                    else:
-                        links['external'].append(absolute_url)
-                except:
-                    links['invalid'].append(href)
-        
-        return links
+        index = self._index_soup()
+        hrefs = (link['href'] for link in index['a']) if index else ()
+        return classify_links(hrefs, self.url)
     
     def get_schema_markup(self):
         """Extract JSON-LD and Microdata schema - FIXED validation"""
         schemas = {'json_ld': [], 'microdata': []}
         
-        if self.soup:
+        index = self._index_soup()
+        if index:
             # JSON-LD - CRITICAL FIX #3: Validate the schema is parseable
-            for script in self.soup.find_all('script', type='application/ld+json'):
+            for script in index['json_ld']:
+                # .string re-walks the tag's children, so read it once and
+                # skip empty scripts before any parsing work
+                script_text = script.string
+                if not script_text:
+                    continue
                 try:
-                    import json
-                    if script.string:
-                        schema_data = json.loads(script.string)
-                        # Only add if it's valid and has content
-                        if schema_data and isinstance(schema_data, (dict, list)):
-                            # Ensure it has @type or is a list of objects with @type
-                            if isinstance(schema_data, dict):
-                                if '@type' in schema_data or '@context' in schema_data:
-                                    schemas['json_ld'].append(schema_data)
-                            elif isinstance(schema_data, list) and len(schema_data) > 0:
-                                # For arrays, check if at least one item has @type
-                                if any('@type' in item for item in schema_data if isinstance(item, dict)):
-                                    schemas['json_ld'].append(schema_data)
-                except json.JSONDecodeError:
+                    schema_data = json_loads(str(script_text))
+                    # Only add if it's valid and has content
+                    if schema_data and isinstance(schema_data, (dict, list)):
+                        # Ensure it has @type or is a list of objects with @type
+                        if isinstance(schema_data, dict):
+                            if '@type' in schema_data or '@context' in schema_data:
+                                schemas['json_ld'].append(schema_data)
+                        elif isinstance(schema_data, list) and len(schema_data) > 0:
+                            # For arrays, check if at least one item has @type
+                            if any('@type' in item for item in schema_data if isinstance(item, dict)):
+                                schemas['json_ld'].append(schema_data)
+                except JSONDecodeError:
                     # Skip invalid JSON
                     continue
                 except Exception:
@@ -243,7 +472,7 @@ class WebsiteFetcher:
                     continue
             
             # Microdata - FIXED: Only count valid microdata
-            for item in self.soup.find_all(attrs={'itemtype': True}):
+            for item in index['itemtype']:
                 itemtype = item.get('itemtype')
                 if itemtype:  # Only add if itemtype has a value
                     schemas['microdata'].append(itemtype)
@@ -251,22 +480,16 @@ class WebsiteFetcher:
         return schemas
     
     def get_meta_tags(self):
-        """Extract all meta tags"""
-        meta_tags = {}
-        if self.soup:
-            for meta in self.soup.find_all('meta'):
-                name = meta.get('name') or meta.get('property') or meta.get('http-equiv')
-                content = meta.get('content')
-                if name and content:
-                    meta_tags[name] = content
-        return meta_tags
+        """Extract all meta tags from <head>"""
+        if self._ensure_metadata():
+            return dict(self._meta_tags)
+        return {}
     
     def check_viewport(self):
         """Check for viewport meta tag - IMPROVED with validation"""
-        if self.soup:
-            viewport = self.soup.find('meta', attrs={'name': 'viewport'})
-            if viewport:
-                content = viewport.get('content', '')
+        if self._ensure_metadata():
+            content = self._meta_by_name.get('viewport')
+            if content is not None:
                 # Check if it has the expected viewport properties
                 if 'width=' in content.lower() or 'initial-scale' in content.lower():
                     return True
@@ -274,10 +497,8 @@ class WebsiteFetcher:
     
     def check_robots_meta(self):
         """Check robots meta tag"""
-        if self.soup:
-            robots = self.soup.find('meta', attrs={'name': 'robots'})
-            if robots:
-                return robots.get('content', '')
+        if self._ensure_metadata():
+            return self._meta_by_name.get('robots')
         return None
     
     def get_word_count(self):
@@ -289,13 +510,41 @@ class WebsiteFetcher:
         return len(meaningful_words)
     
     def fetch_robots_txt(self):
-        """Fetch and parse robots.txt"""
+        """Fetch and parse robots.txt (requested once per fetcher)"""
+        if self._robots_fetched:
+            return self._robots_txt
         try:
-            parsed_url = urlparse(self.url)
-            robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
+            robots_url = f"{self._parsed_base.scheme}://{self._parsed_base.netloc}/robots.txt"
             response = requests.get(robots_url, timeout=10)
             if response.status_code == 200:
-                return response.text
+                self._robots_txt = response.text
         except:
             pass
-        return None
+        self._robots_fetched = True
+        return self._robots_txt
+    
+    def snapshot(self):
+        """All page fields as one PageSnapshot, built once per fetch.
+        
+        The DOM accessors hold the GIL while walking the soup, so they run
+        on the calling thread; the robots.txt request is the only real I/O
+        and runs on a worker thread alongside them.
+        """
+        if self._snapshot is None:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                robots_future = executor.submit(self.fetch_robots_txt)
+                fields = {
+                    'title': self.get_title(),
+                    'meta_description': self.get_meta_description(),
+                    'meta_tags': self.get_meta_tags(),
+                    'viewport': self.check_viewport(),
+                    'robots_meta': self.check_robots_meta(),
+                    'headings': self.get_headings(),
+                    'images': self.get_images(),
+                    'links': self.get_links(),
+                    'schema_markup': self.get_schema_markup(),
+                    'text_content': self.get_text_content(),
+                    'word_count': self.get_word_count(),
+                }
+                self._snapshot = PageSnapshot(robots_txt=robots_future.result(), **fields)
+        return self._snapshot
@@ -1,75 +1,333 @@
 """Firecrawl-based fetcher for enhanced content extraction"""
 
-from firecrawl import Firecrawl
-import os
-from bs4 import BeautifulSoup
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+import hashlib
+import html
+import importlib.util
 import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+from lxml import etree
+from lxml import html as lxml_html
+import mistune
 import re
+from mistune.renderers.html import HTMLRenderer
+import config
+from utils.parsing import JSONDecodeError, WHITESPACE_RE, classify_links, json_loads
+from utils.snapshot import PageSnapshot
+
+# Tags the analyzers look up on fetcher.soup, plus the head/content tags
+# callers commonly query; everything else is skipped at parse time
+_SOUP_TAGS = [
+    'title', 'meta', 'link', 'style', 'script',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'table', 'img', 'a', 'button',
+    'main', 'article', 'section', 'aside', 'nav', 'header', 'footer',
+]
+
+# Inline markdown syntax stripped by _markdown_to_text, compiled once.
+# Bracket/target classes exclude their own opening delimiter, so a failed
+# match stops at the next '[' or '(' instead of rescanning the rest of the
+# text (unbalanced input used to go quadratic); one level of balanced
+# parentheses is allowed inside a target, e.g. wiki-style URLs, and one
+# level of balanced brackets inside image alt text.
+_RE_IMG = re.compile(r'!\[(?:[^\[\]]|\[[^\[\]]*\])*\]\((?:[^()\n]|\([^()\n]*\))*\)')
+_RE_LINK = re.compile(r'\[([^\[\]]+)\]\((?:[^()\n]|\([^()\n]*\))+\)')
+# Emphasis openers are spelled as a literal char plus {0,2} more (same as
+# {1,3}) so the regex engine can jump between candidates with a fast
+# literal search instead of trying the pattern at every position
+_RE_EMPH_STAR = re.compile(r'\*\*{0,2}([^\*]+)\*{1,3}')
+_RE_EMPH_UNDERSCORE = re.compile(r'__{0,2}([^_]+)_{1,3}')
+# A code span closes with the same number of backticks it opened with
+_RE_CODE = re.compile(r'(`{1,3})[^`]+\1')
+
+# A run of 1-6 '#' and the rest of its line. Starting with a literal lets
+# finditer jump straight to '#' characters; whether the run opens its line
+# is checked by the caller, since a leading-whitespace anchor would force a
+# try at every line.
+_RE_MD_HEADING = re.compile(r'#(#{0,5})(?!#)(.*)')
+
+# Markdown token stream (no rendering) with the same plugins as mistune.html,
+# so markdown-only image extraction sees exactly what the HTML path would
+_MD_AST = mistune.create_markdown(renderer=None, plugins=['strikethrough', 'footnotes', 'table'])
+# Only used for safe_url(), so image src values match the rendered <img src>
+# (which lxml hands back unescaped)
+_MD_HTML_RENDERER = HTMLRenderer(escape=False)
+
+# Text nodes for the HTML text fallback, minus anything under boilerplate tags
+_TEXT_XPATH = etree.XPath('//text()[not(%s)]' % ' or '.join(
+    f'ancestor::{tag}' for tag in ('script', 'style', 'nav', 'footer', 'header')
+))
+
+# Shared by every fetcher in the process so parallel analyses don't stampede the API
+_FC_SEM = threading.BoundedSemaphore(config.FIRECRAWL_CONCURRENCY)
+
+# robots.txt is requested here while the Firecrawl scrape is in flight
+_ROBOTS_POOL = ThreadPoolExecutor(max_workers=4)
+
+# One robots.txt request per origin per CACHE_TTL: {origin: (future, started)},
+# so a batch over many pages of one site asks it for robots.txt once
+_ROBOTS_FUTURES = {}
+_ROBOTS_LOCK = threading.Lock()
+
+# Background parsing: fetch() hands the HTML off here and returns immediately
+_PARSE_POOL = ThreadPoolExecutor(max_workers=4)
+
+# When the disk cache was last swept for expired entries (see _prune_cache)
+_last_cache_prune = 0.0
+
+# File names _store_cached creates: sha256 entries and its mkstemp temp files.
+# The cache dir comes from the environment, so nothing else is ever pruned.
+_CACHE_FILE_RE = re.compile(r'(?:[0-9a-f]{64}\.json|firecrawl-\w+\.tmp)')
+
+
+def _read_document_attrs(scrape_result):
+    """Normalize a V2 Document into the scraped_data dict"""
+    return {
+        'markdown': scrape_result.markdown or '',
+        'html': scrape_result.html or '',
+        'links': scrape_result.links or [],
+    }
+
+
+def _read_data_dict(scrape_result):
+    """Normalize a legacy result with a .data payload into the scraped_data dict"""
+    data = scrape_result.data if isinstance(scrape_result.data, dict) else {}
+    return {
+        'markdown': data.get('markdown') or '',
+        'html': data.get('html') or '',
+        'links': data.get('links') or [],
+    }
+
+
+@lru_cache(maxsize=None)
+def _scrape_result_reader():
+    """Pick the normalizer for this SDK's result shape (probed once, on first scrape)"""
+    # The V2 SDK returns a Document with .markdown/.html/.links attributes;
+    # older builds wrap the payload in a .data dict
+    try:
+        has_v2 = importlib.util.find_spec('firecrawl.v2.types') is not None
+    except ImportError:
+        # find_spec imports the parent packages, which may not exist
+        has_v2 = False
+    return _read_document_attrs if has_v2 else _read_data_dict
+
+
+def _read_scrape_result(scrape_result):
+    """Normalize a Firecrawl scrape result into the scraped_data dict"""
+    return _scrape_result_reader()(scrape_result)
+
+
+def _markdown_images(tokens):
+    """Yield (alt, src) for every image in the tokens, in document order; alt is None if absent"""
+    for token in tokens:
+        if token['type'] == 'image':
+            # The rendered alt is the children's text with markup stripped
+            yield html.unescape(_token_text(token['children'])), html.unescape(_MD_HTML_RENDERER.safe_url(token['attrs']['url']))
+        elif 'children' in token:
+            yield from _markdown_images(token['children'])
+        elif token['type'] in ('block_html', 'inline_html') and '<img' in token['raw'].lower():
+            # Raw HTML passes through to the rendered page untouched
+            for img in lxml_html.fragment_fromstring(token['raw'], create_parent=True).iter('img'):
+                yield img.get('alt'), img.get('src', '')
+
+
+def _token_text(tokens):
+    """Plain text of inline tokens, as striptags() leaves the rendered HTML"""
+    parts = []
+    for token in tokens:
+        if 'children' in token:
+            parts.append(_token_text(token['children']))
+        elif token['type'] in ('softbreak', 'linebreak'):
+            parts.append('\n')
+        elif token['type'] != 'inline_html':
+            parts.append(token.get('raw', ''))
+    return ''.join(parts)
+
+
+def _is_empty_scrape(scraped_data):
+    """True for Firecrawl's silent-empty failure: success, but no content at all"""
+    return not scraped_data['markdown'].strip() and not scraped_data['html'].strip()
+
+
+def _prune_cache(now):
+    """Delete this module's cache entries (and stray temp files) older than the TTL"""
+    cutoff = now - config.FIRECRAWL_CACHE_TTL
+    try:
+        entries = os.scandir(config.FIRECRAWL_CACHE_DIR)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if (_CACHE_FILE_RE.fullmatch(entry.name) and entry.is_file()
+                        and entry.stat().st_mtime < cutoff):
+                    os.unlink(entry.path)
+            except OSError:
+                continue
+
+
+def _robots_txt_future(origin):
+    """Future for origin's robots.txt, shared by every fetcher in the process"""
+    now = time.time()
+    with _ROBOTS_LOCK:
+        future, started = _ROBOTS_FUTURES.get(origin, (None, 0))
+        if future is None or started <= now - config.CACHE_TTL:
+            future = _ROBOTS_POOL.submit(_request_robots_txt, origin)
+            _ROBOTS_FUTURES[origin] = (future, now)
+    return future
+
+
+def _request_robots_txt(origin):
+    """GET robots.txt over the pooled session; None if unavailable"""
+    try:
+        response = _robots_session().get(f"{origin}/robots.txt", timeout=5)
+        if response.status_code == 200:
+            return response.text
+    except:
+        pass
+    return None
+
+
+def _parse_tree(html_content):
+    """lxml document for the extractors, or None if the HTML is unparseable"""
+    # Parse bytes so an XML encoding declaration in the HTML can't trip lxml
+    parser = lxml_html.HTMLParser(encoding='utf-8')
+    try:
+        return lxml_html.document_fromstring(html_content.encode('utf-8'), parser=parser)
+    except etree.ParserError:
+        return None
+
+
+def _parse_soup(html_content):
+    """Strained BeautifulSoup tree for the analyzers"""
+    # bs4 is only imported once something actually asks for the soup
+    from bs4 import BeautifulSoup, SoupStrainer
+    return BeautifulSoup(html_content, 'lxml', parse_only=SoupStrainer(_SOUP_TAGS))
+
+
+@lru_cache(maxsize=4)
+def _get_app(api_key):
+    """Firecrawl V2 client shared by every fetcher using this API key"""
+    # The SDK takes most of a second to import, so cache hits and
+    # callers that never scrape don't pay for it
+    from firecrawl import Firecrawl
+    return Firecrawl(api_key=api_key)
+
+
+@lru_cache(maxsize=None)
+def _robots_session():
+    """requests.Session with pooled keep-alive connections, shared by all fetchers"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _markdown_to_text(markdown_text):
+    """Strip markdown syntax down to plain text.
+    
+    Block syntax (code fences, heading markers) is handled in one walk over
+    the lines; the inline patterns then run once over the joined text.
+    """
+    raw_lines = markdown_text.split('\n')
+    lines = []
+    i = 0
+    while i < len(raw_lines):
+        line = raw_lines[i]
+        i += 1
+        
+        # Remove code blocks (a fence that never closes is left as text)
+        if line.lstrip().startswith('```'):
+            close = next((j for j in range(i, len(raw_lines)) if raw_lines[j].lstrip().startswith('```')), None)
+            if close is not None:
+                i = close + 1
+                continue
+        
+        # Remove headers markdown
+        if line.startswith('#'):
+            body = line.lstrip('#')
+            # A bare '#' run is an empty heading and leaves nothing behind
+            if len(line) - len(body) <= 6 and (not body or body[:1].isspace()):
+                line = body.lstrip()
+        lines.append(line)
+    
+    text = '\n'.join(lines)
+    
+    # Remove images, then links but keep text
+    text = _RE_IMG.sub('', text)
+    text = _RE_LINK.sub(r'\1', text)
+    
+    # Remove bold/italic markers
+    text = _RE_EMPH_STAR.sub(r'\1', text)
+    text = _RE_EMPH_UNDERSCORE.sub(r'\1', text)
+    
+    # Remove inline code
+    text = _RE_CODE.sub('', text)
+    
+    # Clean up whitespace
+    return WHITESPACE_RE.sub(' ', text).strip()
+
 
 class FirecrawlFetcher:
     """Enhanced fetcher using Firecrawl V2 API for JavaScript-heavy sites"""
     
-    def __init__(self, url, api_key=None):
+    # Set to False (or pass need_html=False) for markdown-only analysis:
+    # Firecrawl skips rendering HTML and no HTML tree is ever built
+    HTML_NEEDED = True
+    
+    def __init__(self, url, api_key=None, need_html=None):
         self.url = url
+        self._parsed_base = urlparse(url)
+        self._base_netloc = self._parsed_base.netloc
         self.api_key = api_key or os.getenv('FIRECRAWL_API_KEY')
+        self.need_html = self.HTML_NEEDED if need_html is None else need_html
+        self.formats = ['markdown', 'links'] + (['html'] if self.need_html else [])
         
         if not self.api_key:
             raise ValueError("Firecrawl API key is required. Set FIRECRAWL_API_KEY environment variable or pass api_key parameter.")
         
-        # Initialize Firecrawl with the V2 API
-        self.app = Firecrawl(api_key=self.api_key)
         self.scraped_data = None
-        self.soup = None
         self.status_code = None
         self.markdown_content = None
         self.html_content = None
+        self._title_text = None
+        self._meta_by_name = None
+        self._meta_tags = None
+        self._parse_futures = {}
+        self._html_from_markdown = False
+        self._robots_future = None
+        self._snapshot = None
         
+    @cached_property
+    def app(self):
+        """Firecrawl V2 client, created on first scrape and shared per API key"""
+        return _get_app(self.api_key)
+    
     def fetch(self):
         """Fetch using Firecrawl V2 API - Returns object with attributes, not dict"""
         try:
-            # V2 API: scrape() returns an object with attributes like .markdown, .html
-            # NOT a dictionary - this was the main issue!
-            scrape_result = self.app.scrape(
-                url=self.url,
-                formats=['markdown', 'html', 'links']
-            )
+            # Re-analyzing a recently scraped URL skips the API round-trip
+            scraped_data = self._load_cached()
+            if scraped_data is None:
+                # Overlap the robots.txt round-trip with the scrape
+                self._start_robots_fetch()
+                scraped_data = self._scrape()
+                # Don't pin a silent-empty failure on disk for the whole TTL
+                if not _is_empty_scrape(scraped_data):
+                    self._store_cached(scraped_data)
             
-            if scrape_result:
-                self.status_code = 200
-                
-                # KEY FIX: Access as attributes, not dictionary
-                # The V2 SDK returns an object with attributes like scrape_result.markdown
-                try:
-                    # Try attribute access (correct for V2)
-                    self.markdown_content = scrape_result.markdown if hasattr(scrape_result, 'markdown') else ''
-                    self.html_content = scrape_result.html if hasattr(scrape_result, 'html') else ''
-                    
-                    # Debug: if both are empty, try inspecting the object
-                    if not self.markdown_content and not self.html_content:
-                        # Try to get the data attribute (alternative structure)
-                        if hasattr(scrape_result, 'data'):
-                            data = scrape_result.data
-                            self.markdown_content = data.get('markdown', '') if isinstance(data, dict) else ''
-                            self.html_content = data.get('html', '') if isinstance(data, dict) else ''
-                        
-                except AttributeError as e:
-                    raise Exception(f"Unexpected response structure from Firecrawl: {str(e)}. Response object: {type(scrape_result)}")
-                
-                # If no HTML but we have markdown, create basic HTML
-                if not self.html_content and self.markdown_content:
-                    self.html_content = self._markdown_to_html(self.markdown_content)
-                
-                # Create BeautifulSoup object for compatibility with existing analyzers
-                if self.html_content:
-                    self.soup = BeautifulSoup(self.html_content, 'lxml')
-                elif self.markdown_content:
-                    # Fallback: wrap markdown in HTML tags if no HTML provided
-                    html = self._markdown_to_html(self.markdown_content)
-                    self.soup = BeautifulSoup(html, 'lxml')
-                
-                return True
-            else:
-                raise Exception("No data returned from Firecrawl")
+            self._apply_scraped(scraped_data)
+            return True
                 
         except Exception as e:
             error_msg = str(e)
@@ -86,30 +344,213 @@ class FirecrawlFetcher:
             else:
                 raise Exception(f"❌ Firecrawl fetch failed: {error_msg}")
     
-    def _markdown_to_html(self, markdown_text):
-        """Convert markdown to basic HTML for BeautifulSoup parsing"""
-        html = markdown_text
+    async def fetch_async(self):
+        """Async fetch for multi-URL pipelines.
+        
+        Usage: await asyncio.gather(*(f.fetch_async() for f in fetchers))
+        """
+        # fetch() blocks on the API call, so run it (and the HTML parse) on a
+        # worker thread; the shared semaphore still caps concurrent scrapes
+        await asyncio.to_thread(self.fetch)
+        if self.html_content:
+            await asyncio.to_thread(lambda: self.tree)
+        return True
+    
+    @classmethod
+    def fetch_many(cls, urls, api_key=None, max_workers=None):
+        """Fetch several URLs concurrently.
         
-        # Convert markdown headers to HTML
-        html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-        html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-        html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+        Returns {url: fetcher}; a URL whose fetch failed maps to the
+        exception instead, so one bad page doesn't sink the batch.
+        """
+        urls = list(dict.fromkeys(urls))
+        fetchers = {url: cls(url, api_key=api_key) for url in urls}
         
-        # Convert markdown lists to HTML
-        html = re.sub(r'^\- (.+)$', r'<li>\1</li>', html, flags=re.MULTILINE)
+        # Requests to the same host are serialized so a batch never hits
+        # one site with parallel scrapes
+        host_locks = {fetcher._base_netloc: threading.Lock() for fetcher in fetchers.values()}
         
-        # Convert paragraph breaks
-        html = re.sub(r'\n\n+', '</p><p>', html)
+        def fetch_one(url):
+            fetcher = fetchers[url]
+            with host_locks[fetcher._base_netloc]:
+                fetcher.fetch()
         
-        # Wrap in HTML tags
-        html = f"<html><body><p>{html}</p></body></html>"
-        return html
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers or config.FIRECRAWL_MAX_WORKERS) as executor:
+            futures = {url: executor.submit(fetch_one, url) for url in urls}
+            for url, future in futures.items():
+                error = future.exception()
+                results[url] = error if error else fetchers[url]
+        return results
+    
+    def _scrape(self):
+        """Run the Firecrawl scrape with throttling and backoff, normalized into a dict"""
+        max_retries = config.FIRECRAWL_MAX_RETRIES
+        scraped_data = None
+        
+        for attempt in range(max_retries + 1):
+            delay = config.FIRECRAWL_RETRY_BASE_DELAY * 2 ** attempt
+            try:
+                with _FC_SEM:
+                    # V2 API: scrape() returns an object with attributes like .markdown, .html
+                    # NOT a dictionary - this was the main issue!
+                    scrape_result = self.app.scrape(
+                        url=self.url,
+                        formats=self.formats
+                    )
+            except Exception as e:
+                error_msg = str(e).lower()
+                if ('429' in error_msg or 'rate limit' in error_msg) and attempt < max_retries:
+                    time.sleep(delay)
+                    continue
+                raise
+            
+            if not scrape_result:
+                raise Exception("No data returned from Firecrawl")
+            
+            # KEY FIX: Access as attributes, not dictionary
+            # The accessor for this SDK's result shape is picked on the first scrape
+            try:
+                scraped_data = _read_scrape_result(scrape_result)
+            except AttributeError as e:
+                raise Exception(f"Unexpected response structure from Firecrawl: {str(e)}. Response object: {type(scrape_result)}")
+            
+            # Firecrawl sometimes reports success with no content; try again.
+            # A short page is still a page, so only a fully empty result counts
+            if not _is_empty_scrape(scraped_data):
+                break
+            if attempt < max_retries:
+                time.sleep(delay)
+        
+        return scraped_data
+    
+    def _apply_scraped(self, scraped_data):
+        """Load a scraped_data dict into the fetcher's content fields"""
+        self.status_code = 200
+        self.scraped_data = scraped_data
+        self.markdown_content = scraped_data['markdown']
+        self.html_content = scraped_data['html']
+        
+        # If no HTML but we have markdown, create basic HTML (unless the
+        # caller asked for markdown-only analysis)
+        self._html_from_markdown = not self.html_content and bool(self.markdown_content)
+        if self._html_from_markdown and self.need_html:
+            self.html_content = self._markdown_to_html(self.markdown_content)
+        
+        self._reset_parsed()
+        self._title_text = None
+        self._meta_by_name = None
+        
+        # Start the lxml parse in the background so it overlaps whatever the
+        # caller does next; the tree property only blocks if it isn't done yet.
+        # The soup stays lazy: bs4 builds its tree in Python callbacks that
+        # hold the GIL, so parsing it "in the background" would mostly just
+        # compete with the caller, and most callers never touch it
+        if self.html_content:
+            self._parse_futures = {'tree': _PARSE_POOL.submit(_parse_tree, self.html_content)}
+    
+    def _cache_path(self):
+        """Disk cache file for this URL's scrape in the requested formats"""
+        key = hashlib.sha256(f"{self.url}|{','.join(self.formats)}".encode('utf-8')).hexdigest()
+        return os.path.join(config.FIRECRAWL_CACHE_DIR, f"{key}.json")
+    
+    def _load_cached(self):
+        """Return the cached scraped_data for this URL, or None if missing/expired"""
+        if not config.ENABLE_CACHING:
+            return None
+        try:
+            with open(self._cache_path(), 'rb') as f:
+                entry = json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+        # Anything that isn't an entry we wrote counts as a miss
+        if not isinstance(entry, dict) or not isinstance(entry.get('data'), dict):
+            return None
+        if entry.get('_ts', 0) <= time.time() - config.FIRECRAWL_CACHE_TTL:
+            return None
+        return entry['data']
+    
+    def _store_cached(self, scraped_data):
+        """Write scraped_data to the disk cache (best effort)"""
+        global _last_cache_prune
+        if not config.ENABLE_CACHING:
+            return
+        now = time.time()
+        tmp_path = None
+        try:
+            os.makedirs(config.FIRECRAWL_CACHE_DIR, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=config.FIRECRAWL_CACHE_DIR, prefix='firecrawl-', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'_ts': now, 'url': self.url, 'data': scraped_data}, f)
+            os.replace(tmp_path, self._cache_path())
+        except (OSError, TypeError, ValueError):
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        
+        # Expired entries are never read again, so sweep them out about once per TTL
+        if now - _last_cache_prune >= config.FIRECRAWL_CACHE_TTL:
+            _last_cache_prune = now
+            _prune_cache(now)
+    
+    def _reset_parsed(self):
+        """Drop the memoized trees and results so they're rebuilt from the new content"""
+        for name in ('soup', 'tree', 'text_content', 'word_count', 'headings', 'images', 'links'):
+            self.__dict__.pop(name, None)
+        self._parse_futures = {}
+        self._snapshot = None
+    
+    @cached_property
+    def soup(self):
+        """BeautifulSoup tree kept for the analyzers"""
+        if not self.html_content:
+            return None
+        return _parse_soup(self.html_content)
+    
+    @cached_property
+    def tree(self):
+        """lxml document queried by the extractors"""
+        if not self.html_content:
+            return None
+        future = self._parse_futures.get('tree')
+        return future.result() if future else _parse_tree(self.html_content)
+    
+    def _markdown_to_html(self, markdown_text):
+        """Convert markdown to HTML for the tree-based extractors"""
+        # One tokenizer pass; also yields proper <ul>/<li>, <p> and h1-h6
+        return f"<html><body>{mistune.html(markdown_text)}</body></html>"
+    
+    def _ensure_metadata(self):
+        """Collect the title and meta tags in one tree pass, once per fetch"""
+        if self._meta_by_name is not None:
+            return True
+        if self.tree is None:
+            return False
+        
+        self._meta_by_name = {}
+        self._meta_tags = {}
+        for tag in self.tree.iter('title', 'meta'):
+            if tag.tag == 'title':
+                if self._title_text is None:
+                    self._title_text = str(tag.text_content())
+                continue
+            
+            content = tag.get('content')
+            # First <meta name=...> wins, matching a find() for the name
+            if tag.get('name'):
+                self._meta_by_name.setdefault(tag.get('name').lower(), content or '')
+            name = tag.get('name') or tag.get('property') or tag.get('http-equiv')
+            if name and content:
+                self._meta_tags[name] = content
+        return True
     
     def get_title(self):
         """Extract page title"""
-        if self.soup:
-            title_tag = self.soup.find('title')
-            return title_tag.get_text().strip() if title_tag else ""
+        if self._ensure_metadata():
+            return self._title_text.strip() if self._title_text else ""
         
         # Try to extract from first H1 in markdown
         if self.markdown_content:
@@ -122,10 +563,10 @@ class FirecrawlFetcher:
     
     def get_meta_description(self):
         """Extract meta description"""
-        if self.soup:
-            meta_desc = self.soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                return meta_desc['content'].strip()
+        if self._ensure_metadata():
+            content = self._meta_by_name.get('description')
+            if content:
+                return content.strip()
         
         # Fallback to first paragraph
         if self.markdown_content:
@@ -136,93 +577,81 @@ class FirecrawlFetcher:
         
         return ""
     
-    def get_headings(self):
+    @cached_property
+    def headings(self):
         """Extract all headings from markdown or HTML"""
         headings = {'h1': [], 'h2': [], 'h3': [], 'h4': [], 'h5': [], 'h6': []}
         
         # Extract from markdown (more reliable)
-        if self.markdown_content:
-            lines = self.markdown_content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line.startswith('#'):
-                    level = 0
-                    for char in line:
-                        if char == '#':
-                            level += 1
-                        else:
-                            break
-                    
-                    if 1 <= level <= 6:
-                        heading_text = line[level:].strip()
-                        if heading_text:
-                            headings[f'h{level}'].append(heading_text)
+        markdown = self.markdown_content
+        if markdown:
+            for match in _RE_MD_HEADING.finditer(markdown):
+                # Only whitespace may precede the '#' run on its line
+                start = match.start()
+                if markdown[markdown.rfind('\n', 0, start) + 1:start].strip():
+                    continue
+                heading_text = match.group(2).strip()
+                if heading_text:
+                    headings[f'h{len(match.group(1)) + 1}'].append(heading_text)
         
-        # Fallback to HTML if no markdown headings
-        if not any(headings.values()) and self.soup:
-            for level in range(1, 7):
-                tag = f'h{level}'
-                for heading in self.soup.find_all(tag):
-                    text = heading.get_text().strip()
-                    if text:
-                        headings[tag].append(text)
+        # Fallback to HTML if no markdown headings (one pass over h1-h6)
+        if not any(headings.values()) and self.tree is not None:
+            for heading in self.tree.iter('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+                text = heading.text_content().strip()
+                if text:
+                    headings[heading.tag].append(text)
         
         return headings
     
-    def get_text_content(self):
+    def get_headings(self):
+        """Extract all headings from markdown or HTML"""
+        return self.headings
+    
+    @cached_property
+    def text_content(self):
         """Extract main text content from markdown"""
         if self.markdown_content:
-            text = self.markdown_content
-            
-            # Remove images
-            text = re.sub(r'!\[.*?\]\(.*?\)', '', text)
-            
-            # Remove links but keep text
-            text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-            
-            # Remove headers markdown
-            text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-            
-            # Remove bold/italic markers
-            text = re.sub(r'\*{1,3}([^\*]+)\*{1,3}', r'\1', text)
-            text = re.sub(r'_{1,3}([^_]+)_{1,3}', r'\1', text)
-            
-            # Remove code blocks
-            text = re.sub(r'```[^`]*```', '', text, flags=re.DOTALL)
-            text = re.sub(r'`[^`]+`', '', text)
-            
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text
+            return _markdown_to_text(self.markdown_content)
         
-        # Fallback to soup
-        elif self.soup:
-            for element in self.soup(["script", "style", "nav", "footer", "header"]):
-                element.decompose()
-            
-            text = self.soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            return text
+        # Fallback to the HTML tree; one XPath query collects the text nodes
+        # outside script/style/nav/footer/header without mutating the tree
+        elif self.tree is not None:
+            return WHITESPACE_RE.sub(' ', ''.join(_TEXT_XPATH(self.tree))).strip()
         
         return ""
     
+    def get_text_content(self):
+        """Extract main text content from markdown"""
+        return self.text_content
+    
     def get_markdown_content(self):
         """Get clean markdown - perfect for AI analysis"""
         return self.markdown_content or ''
     
-    def get_images(self):
+    @cached_property
+    def images(self):
         """Extract images from HTML"""
         images = []
         
-        if self.soup:
-            for img in self.soup.find_all('img'):
+        if self._html_from_markdown:
+            # The HTML was generated from the markdown, so read the images
+            # from mistune's token stream instead of building a tree for it.
+            # Unlike a regex this skips code spans/blocks and resolves
+            # reference-style images.
+            for alt_text, src in _markdown_images(_MD_AST(self.markdown_content)):
+                has_alt_attr = alt_text is not None
+                alt_text = (alt_text or '').strip()
+                images.append({
+                    'src': src,
+                    'alt': alt_text,
+                    'has_alt': has_alt_attr and len(alt_text) > 0,
+                    'is_decorative': has_alt_attr and len(alt_text) == 0,
+                    'missing_alt': not has_alt_attr
+                })
+        elif self.tree is not None:
+            for img in self.tree.iter('img'):
                 alt_text = img.get('alt', '').strip()
-                has_alt_attr = 'alt' in img.attrs
+                has_alt_attr = 'alt' in img.attrib
                 has_meaningful_alt = has_alt_attr and len(alt_text) > 0
                 is_decorative = has_alt_attr and len(alt_text) == 0
                 
@@ -236,50 +665,43 @@ class FirecrawlFetcher:
         
         return images
     
+    def get_images(self):
+        """Extract images from HTML"""
+        return self.images
+    
+    @cached_property
+    def links(self):
+        """Extract internal and external links"""
+        if self.tree is not None:
+            hrefs = (link.get('href') or '' for link in self.tree.iter('a'))
+        else:
+            # Markdown-only fetch: classify the links Firecrawl collected
+            hrefs = (self.scraped_data or {}).get('links') or []
+        return classify_links(hrefs, self.url)
+    
     def get_links(self):
         """Extract internal and external links"""
-        links = {'internal': [], 'external': [], 'invalid': []}
-        
-        if self.soup:
-            from urllib.parse import urlparse, urljoin
-            base_domain = urlparse(self.url).netloc
-            
-            for link in self.soup.find_all('a', href=True):
-                href = link['href'].strip()
-                
-                if not href or href.startswith('#') or href.startswith('javascript:') or href.startswith('mailto:') or href.startswith('tel:'):
-                    continue
-                
-                try:
-                    absolute_url = urljoin(self.url, href)
-                    link_domain = urlparse(absolute_url).netloc
-                    
-                    if link_domain == base_domain or not link_domain:
-                        links['internal'].append(absolute_url)
-                    else:
-                        links['external'].append(absolute_url)
-                except:
-                    links['invalid'].append(href)
-        
-        return links
+        return self.links
     
     def get_schema_markup(self):
         """Extract JSON-LD and Microdata schema"""
         schemas = {'json_ld': [], 'microdata': []}
         
-        if self.soup:
+        if self.tree is not None:
             # JSON-LD
-            for script in self.soup.find_all('script', type='application/ld+json'):
+            for script in self.tree.xpath('//script[@type="application/ld+json"]'):
+                script_text = script.text
+                if not script_text:
+                    continue
                 try:
-                    if script.string:
-                        schema_data = json.loads(script.string)
-                        if schema_data and isinstance(schema_data, (dict, list)):
-                            schemas['json_ld'].append(schema_data)
-                except json.JSONDecodeError:
+                    schema_data = json_loads(script_text)
+                    if schema_data and isinstance(schema_data, (dict, list)):
+                        schemas['json_ld'].append(schema_data)
+                except JSONDecodeError:
                     continue
             
             # Microdata
-            for item in self.soup.find_all(attrs={'itemtype': True}):
+            for item in self.tree.xpath('//*[@itemtype]'):
                 itemtype = item.get('itemtype')
                 if itemtype:
                     schemas['microdata'].append(itemtype)
@@ -288,57 +710,64 @@ class FirecrawlFetcher:
     
     def get_meta_tags(self):
         """Extract all meta tags"""
-        meta_tags = {}
-        
-        if self.soup:
-            for meta in self.soup.find_all('meta'):
-                name = meta.get('name') or meta.get('property') or meta.get('http-equiv')
-                content = meta.get('content')
-                if name and content:
-                    meta_tags[name] = content
-        
-        return meta_tags
+        if self._ensure_metadata():
+            return dict(self._meta_tags)
+        return {}
     
     def check_viewport(self):
         """Check for viewport meta tag"""
-        if self.soup:
-            viewport = self.soup.find('meta', attrs={'name': 'viewport'})
-            if viewport:
-                content = viewport.get('content', '')
-                if 'width=' in content.lower():
-                    return True
+        if self._ensure_metadata():
+            content = self._meta_by_name.get('viewport')
+            if content and 'width=' in content.lower():
+                return True
         return False
     
     def check_robots_meta(self):
         """Check robots meta tag"""
-        if self.soup:
-            robots = self.soup.find('meta', attrs={'name': 'robots'})
-            if robots:
-                return robots.get('content', '')
+        if self._ensure_metadata():
+            return self._meta_by_name.get('robots')
         return None
     
+    @cached_property
+    def word_count(self):
+        """Word count of main content, computed once per fetch"""
+        # Filter out very short "words" that are likely artifacts
+        return len([w for w in self.text_content.split() if len(w) > 1])
+    
     def get_word_count(self):
         """Get word count of main content"""
-        text = self.get_text_content()
-        words = text.split()
-        meaningful_words = [w for w in words if len(w) > 1]
-        return len(meaningful_words)
+        return self.word_count
     
     def fetch_robots_txt(self):
-        """Fetch and parse robots.txt"""
-        try:
-            import requests
-            from urllib.parse import urlparse
-            
-            parsed_url = urlparse(self.url)
-            robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
-            
-            response = requests.get(robots_url, timeout=5)
-            if response.status_code == 200:
-                return response.text
-        except:
-            pass
-        return None
+        """Fetch and parse robots.txt (requested once per origin, see _robots_txt_future)"""
+        return self._start_robots_fetch().result()
+    
+    def _start_robots_fetch(self):
+        """Kick off (or join) the robots.txt request for this origin; returns its future"""
+        if self._robots_future is None:
+            self._robots_future = _robots_txt_future(f"{self._parsed_base.scheme}://{self._parsed_base.netloc}")
+        return self._robots_future
+    
+    def snapshot(self):
+        """All page fields as one PageSnapshot, built once per fetch"""
+        if self._snapshot is None:
+            # The getters share the parsed tree and their memoized results,
+            # so this costs one pass per field the first time and nothing after
+            self._snapshot = PageSnapshot(
+                title=self.get_title(),
+                meta_description=self.get_meta_description(),
+                meta_tags=self.get_meta_tags(),
+                viewport=self.check_viewport(),
+                robots_meta=self.check_robots_meta(),
+                headings=self.get_headings(),
+                images=self.get_images(),
+                links=self.get_links(),
+                schema_markup=self.get_schema_markup(),
+                text_content=self.get_text_content(),
+                word_count=self.get_word_count(),
+                robots_txt=self.fetch_robots_txt(),
+            )
+        return self._snapshot
     
     def get_structured_insights(self):
         """Extract any structured insights from Firecrawl response (graceful degradation)"""
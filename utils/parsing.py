@@ -0,0 +1,74 @@
+"""Parsing helpers shared by WebsiteFetcher and FirecrawlFetcher"""
+
+import re
+from urllib.parse import urljoin, urlparse
+
+# Use orjson for JSON-LD parsing and cache reads when it's installed. It only
+# accepts exact str/bytes, so bs4 strings must be converted with str() first.
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    import json
+    json_loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+# Collapses any whitespace run (including newlines) to a single space
+WHITESPACE_RE = re.compile(r'\s+')
+
+# href prefixes that never point at a crawlable page
+_SKIP_PREFIXES = ('#', 'javascript:', 'mailto:', 'tel:')
+
+# Host of an absolute http(s) URL (IPv6 literals are left to urlparse)
+_ABSOLUTE_URL_RE = re.compile(r'https?://([^/?#\[\]]+)(?=[/?#]|$)')
+
+# hrefs urljoin rewrites, so they can't take the fast path: dot segments,
+# an empty query or fragment (dropped), and tab/CR/LF (removed)
+_NEEDS_URLJOIN_RE = re.compile(r'/\.|[?#]$|\?#|[\t\r\n]')
+
+
+def classify_links(hrefs, base_url):
+    """Sort hrefs into unique internal and external absolute URLs relative to base_url"""
+    links = {'internal': [], 'external': [], 'invalid': []}
+    parsed_base = urlparse(base_url)
+    base_domain = parsed_base.netloc
+    base_origin = f"{parsed_base.scheme}://{base_domain}" if parsed_base.scheme and base_domain else None
+
+    for href in hrefs:
+        href = href.strip()
+
+        # Skip empty hrefs, anchors, and javascript
+        if not href or href.startswith(_SKIP_PREFIXES):
+            continue
+
+        # Fast paths: root-relative and absolute http(s) links need no
+        # urljoin/urlparse, unless urljoin would rewrite them
+        if not _NEEDS_URLJOIN_RE.search(href):
+            if base_origin and href[0] == '/' and not href.startswith('//'):
+                links['internal'].append(base_origin + href)
+                continue
+            match = _ABSOLUTE_URL_RE.match(href)
+            if match:
+                if match.group(1) == base_domain:
+                    links['internal'].append(href)
+                else:
+                    links['external'].append(href)
+                continue
+
+        try:
+            absolute_url = urljoin(base_url, href)
+            link_domain = urlparse(absolute_url).netloc
+
+            if link_domain == base_domain or not link_domain:
+                links['internal'].append(absolute_url)
+            else:
+                links['external'].append(absolute_url)
+        except:
+            links['invalid'].append(href)
+
+    # Nav/footer repeat the same targets; keep the first occurrence of each
+    for kind in links:
+        links[kind] = list(dict.fromkeys(links[kind]))
+
+    return links
@@ -0,0 +1,27 @@
+"""Result type shared by WebsiteFetcher.snapshot() and FirecrawlFetcher.snapshot()"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class PageSnapshot:
+    """Every accessor's result for one fetched page, gathered in one call"""
+    # Spelled out by hand because dataclass(slots=True) needs Python 3.10
+    __slots__ = (
+        'title', 'meta_description', 'meta_tags', 'viewport', 'robots_meta',
+        'headings', 'images', 'links', 'schema_markup', 'text_content',
+        'word_count', 'robots_txt',
+    )
+    title: str
+    meta_description: str
+    meta_tags: dict
+    viewport: bool
+    robots_meta: Optional[str]  # None without a robots meta tag
+    headings: dict
+    images: list
+    links: dict
+    schema_markup: dict
+    text_content: str
+    word_count: int
+    robots_txt: Optional[str]  # None if robots.txt is missing or unreachable